@@ -1,11 +1,17 @@
+import hashlib
 import os
 import secrets
+import time
+from collections import defaultdict, namedtuple
 from datetime import datetime, timedelta
 from decimal import Decimal
 from functools import wraps
+from io import BytesIO
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask import (
     Flask,
     render_template,
@@ -17,13 +23,15 @@ from flask import (
     flash,
     send_file,
     jsonify,
+    make_response,
 )
 from flask_migrate import Migrate
-from sqlalchemy import func, or_, and_
+from sqlalchemy import func, or_, and_, case, insert, literal, select, update
+from sqlalchemy.orm import joinedload, load_only, selectinload
 
 from models import (
     db,
-    Customer, Vehicle, RepairOrder, ROEvent,
+    Customer, Vehicle, RepairOrder, NumberSequence, ROEvent, ROEventCounter,
     Document, Job, LineItem, Appointment,
     LaborMatrixTier, PartsMatrixTier, Technician
 )
@@ -33,9 +41,52 @@ from pdf import build_document_pdf, build_invoice_pdf
 load_dotenv()
 
 TAX_RATE = Decimal(os.getenv("TAX_RATE", "0.00"))
+ZERO = Decimal("0.00")
+CENT = Decimal("0.01")  # quantize target for money
+
+# used when the labor / parts matrix has no tiers
+DEFAULT_LABOR_RATE = Decimal("115.00")
+DEFAULT_PARTS_MULTIPLIER = Decimal("1.3000")
 APP_USERNAME = os.getenv("APP_USERNAME", "admin")
 APP_PASSWORD = os.getenv("APP_PASSWORD", "password")
 
+# seconds a worker keeps labor/parts matrix tiers before re-reading them
+MATRIX_CACHE_TTL = int(os.getenv("MATRIX_CACHE_TTL", "60"))
+
+# NHTSA make/model responses are cached for a day, up to this many lookups
+NHTSA_CACHE_TTL = 24 * 60 * 60
+NHTSA_CACHE_MAX = 5000
+
+# rendered PDFs of locked/paid documents kept per worker
+PDF_CACHE_MAX = 200
+
+# RO list page sizes; older pages are reached with ?before=<opened_at>&before_id=<id>
+DASHBOARD_PAGE_SIZE = 24
+RO_LIST_PAGE_SIZE = 400
+
+# document totals as shown on read-only pages; persisted by the write routes
+Totals = namedtuple("Totals", "subtotal tax total")
+
+# technician dropdown entry; plain values so it can outlive the request session
+TechOption = namedtuple("TechOption", "id name total_hours")
+
+# allowed values for the status endpoints and ro_detail's ?tab=
+RO_STATUSES = frozenset({"open", "estimate_sent", "work_in_progress", "closed", "canceled"})
+JOB_STATUSES = frozenset({"pending", "approved", "work_in_progress", "completed", "declined"})
+SHARE_JOB_STATUSES = frozenset({"approved", "declined"})
+RO_DETAIL_TABS = frozenset({"estimate", "invoice", "activity", "wip"})
+
+# event types tallied in ro_event_counters for the dashboard close ratio
+COUNTED_EVENTS = ("estimate_sent", "approved")
+
+# pooled session so cache misses reuse the TLS connection to api.nhtsa.gov
+NHTSA = requests.Session()
+NHTSA.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.2),
+))
+
 ENGINE_PRESETS = [
     "2.0L", "2.3L", "2.4L", "2.5L", "2.7L",
     "3.0L", "3.5L", "3.6L",
@@ -45,7 +96,7 @@ ENGINE_PRESETS = [
 
 def D(x) -> Decimal:
     if x is None:
-        return Decimal("0.00")
+        return ZERO
     if isinstance(x, Decimal):
         return x
     return Decimal(str(x))
@@ -62,6 +113,16 @@ def parse_decimal(v):
         return None
 
 
+def parse_iso(v: str) -> datetime:
+    # browsers send UTC as a trailing "Z", which fromisoformat rejects before 3.11
+    return datetime.fromisoformat(v[:-1] if v.endswith("Z") else v)
+
+
+def _norm(x: dict, lo: str, hi: str) -> str:
+    # NHTSA mixes "make"/"Make" style keys between endpoints
+    return (x.get(lo) or x.get(hi) or "").strip()
+
+
 def create_app():
     app = Flask(__name__)
     app.secret_key = os.getenv("SECRET_KEY", "dev-secret-change-me")
@@ -106,6 +167,14 @@ def create_app():
         return redirect(url_for("login"))
 
     # ---------- Helpers ----------
+    # Columns the list pages actually render; the rest stay deferred.
+    ro_list_cols = load_only(
+        RepairOrder.ro_number, RepairOrder.customer_id, RepairOrder.vehicle_id,
+        RepairOrder.status, RepairOrder.opened_at,
+    )
+    customer_list_cols = load_only(Customer.name, Customer.phone, Customer.email)
+    vehicle_list_cols = load_only(Vehicle.year, Vehicle.make, Vehicle.model, Vehicle.engine)
+
     def log_event(ro_id: str, event_type: str, old=None, new=None):
         db.session.add(ROEvent(
             ro_id=ro_id,
@@ -113,6 +182,22 @@ def create_app():
             old_value=str(old) if old is not None else None,
             new_value=str(new) if new is not None else None,
         ))
+        if event_type in COUNTED_EVENTS:
+            # archived ROs are left out of the counters (ro_delete takes theirs
+            # back out), so events logged on them afterwards mustn't count
+            archived = db.session.query(RepairOrder.deleted_at.is_not(None)).filter_by(id=ro_id).scalar()
+            if not archived:
+                bump_event_counter(event_type, 1)
+
+    def bump_event_counter(event_type: str, delta: int):
+        res = db.session.execute(
+            update(ROEventCounter)
+            .where(ROEventCounter.event_type == event_type)
+            .values(count=ROEventCounter.count + delta)
+        )
+        if res.rowcount == 0:
+            # the migration seeds these rows; only a fresh db lands here
+            db.session.add(ROEventCounter(event_type=event_type, count=max(delta, 0)))
 
     def line_amount(li: LineItem) -> Decimal:
         amt = D((li.qty or 0) * (li.unit_price or 0))
@@ -120,39 +205,182 @@ def create_app():
             return -abs(amt)
         return amt
 
-    def active_items_for_totals(items):
-        job_ids = list({i.job_id for i in items if i.job_id})
-        job_status = {}
-        if job_ids:
-            job_status = {
-                j.id: j.status
-                for j in Job.query.filter(Job.id.in_(job_ids)).all()
-            }
-        return [
-            i for i in items
-            if (not i.job_id) or job_status.get(i.job_id) != "declined"
-        ]
+    def line_amount_sql():
+        # SQL counterpart of line_amount() for aggregate queries
+        amount = LineItem.qty * LineItem.unit_price
+        return case((LineItem.item_type == "discount", -func.abs(amount)), else_=amount)
 
-    def recalc_document_totals(doc: Document):
+    def compute_document_totals(doc: Document, items, jobs) -> Totals:
+        # read-path counterpart of persist_document_totals(); doesn't touch doc
         if doc.status in ("locked", "paid") or doc.locked_at is not None:
-            return
+            return Totals(doc.subtotal, doc.tax, doc.total)
 
-        items = LineItem.query.filter_by(document_id=doc.id).all()
-        active_items = active_items_for_totals(items)
-        subtotal = sum((line_amount(i) for i in active_items), start=Decimal("0.00"))
+        declined = {j.id for j in jobs if j.status == "declined"}
+        subtotal = taxable = ZERO
+        for li in items:
+            if li.job_id in declined:
+                continue
+            subtotal += line_amount(li)
+            if li.taxable and li.item_type != "discount":
+                taxable += D((li.qty or 0) * (li.unit_price or 0))
 
-        taxable = sum(
-            (line_amount(i) for i in active_items if i.taxable and i.item_type != "discount"),
-            start=Decimal("0.00"),
-        )
-        tax = (taxable * TAX_RATE).quantize(Decimal("0.01"))
-        total = (subtotal + tax).quantize(Decimal("0.01"))
+        tax = (taxable * TAX_RATE).quantize(CENT)
+        return Totals(subtotal.quantize(CENT), tax, (subtotal + tax).quantize(CENT))
 
-        doc.subtotal = subtotal.quantize(Decimal("0.01"))
+    def persist_document_totals(doc: Document):
+        if doc.status in ("locked", "paid") or doc.locked_at is not None:
+            return
+
+        # Sum in the database; lines on declined jobs don't count toward totals.
+        amount = LineItem.qty * LineItem.unit_price
+        declined_jobs = select(Job.id).where(Job.ro_id == doc.ro_id, Job.status == "declined")
+        subtotal, taxable = db.session.query(
+            func.coalesce(func.sum(line_amount_sql()), 0),
+            func.coalesce(func.sum(case((and_(LineItem.taxable.is_(True), LineItem.item_type != "discount"), amount), else_=0)), 0),
+        ).filter(
+            LineItem.document_id == doc.id,
+            or_(LineItem.job_id.is_(None), LineItem.job_id.not_in(declined_jobs)),
+        ).one()
+
+        subtotal = D(subtotal)
+        tax = (D(taxable) * TAX_RATE).quantize(CENT)
+        total = (subtotal + tax).quantize(CENT)
+
+        doc.subtotal = subtotal.quantize(CENT)
         doc.tax = tax
         doc.total = total
+        # bumped even when the totals come out the same (e.g. a description
+        # edit) so ro_detail's ETag sees every line item change; a counter
+        # because DATETIME only has one-second precision
+        doc.revision = Document.revision + 1
         db.session.add(doc)
 
+    def persist_ro_totals(ro_id: str):
+        # job status changes move lines in/out of every document on the RO
+        for doc in Document.query.filter_by(ro_id=ro_id).all():
+            persist_document_totals(doc)
+
+    def next_ro_number() -> int:
+        bumped = NumberSequence.value + 1
+        mysql = db.session.get_bind().dialect.name == "mysql"
+        if mysql:
+            # MySQL's sequence idiom: LAST_INSERT_ID(expr) hands the new value
+            # back in the UPDATE's OK packet, so no read-back SELECT is needed
+            bumped = func.last_insert_id(bumped)
+        res = db.session.execute(
+            update(NumberSequence)
+            .where(NumberSequence.name == "ro_number")
+            .values(value=bumped)
+            .execution_options(synchronize_session=False)
+        )
+        if res.rowcount == 0:
+            # the migration seeds this row; only a fresh db lands here
+            start = (db.session.query(func.max(RepairOrder.ro_number)).scalar() or 1000) + 1
+            db.session.add(NumberSequence(name="ro_number", value=start))
+            return start
+        if mysql:
+            return res.lastrowid
+        return db.session.query(NumberSequence.value).filter_by(name="ro_number").scalar()
+
+    def load_ro(ro_id: str, *options) -> RepairOrder:
+        # RO with customer + vehicle joined in; callers add collection loaders
+        ro = db.session.execute(
+            select(RepairOrder)
+            .options(joinedload(RepairOrder.customer), joinedload(RepairOrder.vehicle), *options)
+            .where(RepairOrder.id == ro_id)
+        ).unique().scalar_one_or_none()
+        if ro is None:
+            abort(404)
+        return ro
+
+    def load_doc(*criteria) -> Document:
+        # document + its RO/customer/vehicle in one query, then jobs and line items
+        ro_path = joinedload(Document.repair_order)
+        doc = db.session.execute(
+            select(Document)
+            .options(
+                ro_path.joinedload(RepairOrder.customer),
+                ro_path.joinedload(RepairOrder.vehicle),
+                ro_path.selectinload(RepairOrder.jobs),
+                selectinload(Document.line_items),
+            )
+            .where(*criteria)
+        ).unique().scalar_one_or_none()
+        if doc is None:
+            abort(404)
+        return doc
+
+    def load_shared_doc(token: str) -> Document:
+        # public share page/PDF: only the columns those two render
+        ro_path = joinedload(Document.repair_order)
+        doc = db.session.execute(
+            select(Document)
+            .options(
+                load_only(
+                    Document.ro_id, Document.doc_type, Document.version, Document.status,
+                    Document.share_token, Document.locked_at,
+                    Document.subtotal, Document.tax, Document.total,
+                ),
+                ro_path.load_only(RepairOrder.ro_number, RepairOrder.customer_id, RepairOrder.vehicle_id),
+                ro_path.joinedload(RepairOrder.customer).load_only(
+                    Customer.name, Customer.phone, Customer.email, Customer.updated_at,
+                ),
+                ro_path.joinedload(RepairOrder.vehicle).load_only(
+                    Vehicle.year, Vehicle.make, Vehicle.model, Vehicle.engine, Vehicle.vin, Vehicle.odometer_last,
+                ),
+                ro_path.selectinload(RepairOrder.jobs),
+                selectinload(Document.line_items),
+            )
+            .where(Document.share_token == token)
+        ).unique().scalar_one_or_none()
+        if doc is None:
+            abort(404)
+        return doc
+
+    # Locked/paid documents can't change, so their PDF only needs rendering once.
+    pdf_cache = {}
+
+    def cached_pdf(doc: Document, render):
+        if not (doc.status in ("locked", "paid") or doc.locked_at is not None):
+            return render()
+        # customer contact details are printed too; updated_at covers edits to them
+        key = (doc.id, doc.status, doc.locked_at, doc.repair_order.customer.updated_at)
+        data = pdf_cache.get(key)
+        if data is None:
+            data = render().read()
+            if len(pdf_cache) >= PDF_CACHE_MAX:
+                pdf_cache.clear()
+            pdf_cache[key] = data
+        return BytesIO(data)
+
+    def ro_detail_etag(ro_id: str):
+        # Everything ro_detail renders bumps one of these: RO/customer/document/
+        # job updated_at, a document revision, a new event, or technician
+        # rows/hours. One query.
+        # Returns (etag, technician version) or None if the RO doesn't exist.
+        def scalar(*cols, where=None):
+            q = select(*cols)
+            return (q.where(where) if where is not None else q).scalar_subquery()
+
+        row = db.session.execute(
+            select(
+                RepairOrder.updated_at,
+                Customer.updated_at,
+                scalar(func.max(Document.updated_at), where=Document.ro_id == ro_id),
+                scalar(func.sum(Document.revision), where=Document.ro_id == ro_id),
+                scalar(func.max(Job.updated_at), where=Job.ro_id == ro_id),
+                scalar(func.count(ROEvent.id), where=ROEvent.ro_id == ro_id),
+                scalar(func.max(ROEvent.created_at), where=ROEvent.ro_id == ro_id),
+                scalar(func.count(Technician.id)),
+                scalar(func.sum(Technician.total_hours)),
+            )
+            .join(Customer, Customer.id == RepairOrder.customer_id)
+            .where(RepairOrder.id == ro_id)
+        ).first()
+        if row is None:
+            return None
+        return hashlib.sha1(repr(tuple(row)).encode()).hexdigest(), tuple(row[-2:])
+
     def get_or_create_doc(ro_id: str, doc_type: str) -> Document:
         doc = Document.query.filter_by(ro_id=ro_id, doc_type=doc_type, version=1).first()
         if not doc:
@@ -164,89 +392,189 @@ def create_app():
     def ensure_share_token(doc: Document) -> None:
         if getattr(doc, "share_token", None):
             return
-        while True:
-            token = secrets.token_urlsafe(24)
-            if not Document.query.filter_by(share_token=token).first():
-                doc.share_token = token
-                db.session.add(doc)
-                return
-
-    def calc_profit_for_doc(doc_id: str):
-        items = LineItem.query.filter_by(document_id=doc_id).all()
-        revenue = Decimal("0.00")
-        cost = Decimal("0.00")
-        for i in items:
-            revenue += line_amount(i)
-            if i.item_type != "discount" and i.cost is not None:
-                cost += D((i.qty or 0) * (i.cost or 0))
-        gp = revenue - cost
-        margin = (gp / revenue * 100) if revenue != 0 else Decimal("0.00")
-        return {
-            "revenue": revenue.quantize(Decimal("0.01")),
-            "cost": cost.quantize(Decimal("0.01")),
-            "gross_profit": gp.quantize(Decimal("0.01")),
-            "margin_pct": margin.quantize(Decimal("0.01")),
-        }
+        # share_token is UNIQUE in the db; a 24-byte token won't collide in practice
+        doc.share_token = secrets.token_urlsafe(24)
+        db.session.add(doc)
+
+    def profit_for_docs(doc_ids) -> dict:
+        # revenue/cost for several documents in one grouped query
+        rows = db.session.query(
+            LineItem.document_id,
+            func.coalesce(func.sum(line_amount_sql()), 0),
+            func.coalesce(func.sum(case((LineItem.item_type != "discount", LineItem.qty * LineItem.cost))), 0),
+        ).filter(LineItem.document_id.in_(doc_ids)).group_by(LineItem.document_id).all()
+        sums = {doc_id: (D(revenue), D(cost)) for doc_id, revenue, cost in rows}
+
+        profits = {}
+        for doc_id in doc_ids:
+            revenue, cost = sums.get(doc_id, (ZERO, ZERO))
+            gp = revenue - cost
+            margin = (gp / revenue * 100) if revenue != 0 else ZERO
+            profits[doc_id] = {
+                "revenue": revenue.quantize(CENT),
+                "cost": cost.quantize(CENT),
+                "gross_profit": gp.quantize(CENT),
+                "margin_pct": margin.quantize(CENT),
+            }
+        return profits
+
+    def group_items(items):
+        # line items bucketed by job, plus the ones not on any job
+        grouped = defaultdict(list)
+        unassigned = []
+        for li in items:
+            if li.job_id:
+                grouped[li.job_id].append(li)
+            else:
+                unassigned.append(li)
+        return grouped, unassigned
 
-    def job_totals(doc_id: str):
-        items = LineItem.query.filter_by(document_id=doc_id).all()
+    def totals_by_job(items):
+        # one pass over already-loaded line items: per-job amount and labor
+        # hours (same rule as labor_hours_for_job); unassigned lines total
+        # under "__none__"
         totals = {}
+        hours = {}
         for i in items:
             jid = i.job_id or "__none__"
-            totals[jid] = totals.get(jid, Decimal("0.00")) + line_amount(i)
-        return {k: v.quantize(Decimal("0.01")) for k, v in totals.items()}
+            totals[jid] = totals.get(jid, ZERO) + line_amount(i)
+            if i.item_type == "labor" and i.job_id:
+                h = i.labor_hours if i.labor_hours is not None else i.qty
+                hours[i.job_id] = hours.get(i.job_id, ZERO) + D(h)
+        return (
+            {k: v.quantize(CENT) for k, v in totals.items()},
+            {k: v.quantize(CENT) for k, v in hours.items()},
+        )
+
+    def close_ro_if_jobs_done(ro_id: str) -> bool:
+        # one conditional UPDATE instead of counting open jobs first; the
+        # pending job change is autoflushed ahead of it
+        closed_at = datetime.utcnow()
+        open_jobs = select(Job.id).where(Job.ro_id == ro_id, Job.status != "completed")
+        res = db.session.execute(
+            update(RepairOrder)
+            .where(RepairOrder.id == ro_id, ~open_jobs.exists())
+            .values(status="closed", closed_at=closed_at)
+            .execution_options(synchronize_session=False)
+        )
+        if res.rowcount == 0:
+            return False
+        log_event(ro_id, "ro_completed", None, closed_at.isoformat())
+        return True
 
     def ensure_default_job(ro_id: str):
         if Job.query.filter_by(ro_id=ro_id).count() == 0:
-            ro = RepairOrder.query.get(ro_id)
+            ro = db.session.get(RepairOrder, ro_id)
             title = (ro.concern or "Job 1").strip()
             db.session.add(Job(ro_id=ro_id, title=title or "Job 1", status="pending", sort_order=1))
             db.session.commit()
 
     def labor_hours_for_job(doc_id: str, job_id: str) -> Decimal:
-        items = LineItem.query.filter_by(document_id=doc_id, job_id=job_id, item_type="labor").all()
-        total = Decimal("0.00")
-        for item in items:
-            if item.labor_hours is not None:
-                total += D(item.labor_hours)
-            else:
-                total += D(item.qty or 0)
-        return total.quantize(Decimal("0.01"))
+        total = db.session.query(
+            func.coalesce(func.sum(func.coalesce(LineItem.labor_hours, LineItem.qty)), 0)
+        ).filter_by(document_id=doc_id, job_id=job_id, item_type="labor").scalar()
+        return D(total).quantize(CENT)
 
     # -------- Matrix logic --------
+    # Tiers only change from the settings page, so keep them in-process as
+    # (min, max, value) Decimal tuples. Each gunicorn worker has its own copy,
+    # hence the TTL so edits made through another worker are picked up too.
+    app._labor_tiers_cache = None
+    app._parts_tiers_cache = None
+
+    def invalidate_matrix_cache():
+        app._labor_tiers_cache = None
+        app._parts_tiers_cache = None
+
+    def labor_tiers():
+        cached = app._labor_tiers_cache
+        if cached is None or cached[0] < time.monotonic():
+            tiers = [
+                (D(t.min_hours), D(t.max_hours) if t.max_hours is not None else None,
+                 D(t.rate_per_hour).quantize(CENT))
+                for t in LaborMatrixTier.query.order_by(LaborMatrixTier.min_hours.asc()).all()
+            ]
+            cached = app._labor_tiers_cache = (time.monotonic() + MATRIX_CACHE_TTL, tiers)
+        return cached[1]
+
+    def parts_tiers():
+        cached = app._parts_tiers_cache
+        if cached is None or cached[0] < time.monotonic():
+            tiers = [
+                (D(t.min_cost), D(t.max_cost) if t.max_cost is not None else None, D(t.multiplier))
+                for t in PartsMatrixTier.query.order_by(PartsMatrixTier.min_cost.asc()).all()
+            ]
+            cached = app._parts_tiers_cache = (time.monotonic() + MATRIX_CACHE_TTL, tiers)
+        return cached[1]
+
+    # Technician dropdown, kept per worker and keyed by the technician count
+    # and hours total that ro_detail_etag() already reads, so it refills as
+    # soon as any worker adds a tech or logs hours.
+    app._tech_options_cache = None
+
+    def tech_options(version):
+        cached = app._tech_options_cache
+        if cached is None or cached[0] != version:
+            rows = db.session.query(Technician.id, Technician.name, Technician.total_hours).order_by(
+                Technician.name.asc()
+            ).all()
+            cached = app._tech_options_cache = (version, [TechOption(*r) for r in rows])
+        return cached[1]
+
     def get_labor_rate_for_hours(hours: Decimal) -> Decimal:
         """
         Finds the first tier where min_hours <= hours <= max_hours (or max is NULL).
         If no tiers exist, fallback to 115/hr.
         """
-        tiers = LaborMatrixTier.query.order_by(LaborMatrixTier.min_hours.asc()).all()
+        tiers = labor_tiers()
         if not tiers:
-            return Decimal("115.00")
+            return DEFAULT_LABOR_RATE
 
-        for t in tiers:
-            min_h = D(t.min_hours)
-            max_h = D(t.max_hours) if t.max_hours is not None else None
+        for min_h, max_h, rate in tiers:
             if hours >= min_h and (max_h is None or hours <= max_h):
-                return D(t.rate_per_hour).quantize(Decimal("0.01"))
+                return rate
 
-        return D(tiers[-1].rate_per_hour).quantize(Decimal("0.01"))
+        return tiers[-1][2]
 
     def get_parts_multiplier_for_cost(cost: Decimal) -> Decimal:
         """
         Finds tier where min_cost <= cost <= max_cost (or max is NULL).
         If no tiers exist, fallback to 1.30x
         """
-        tiers = PartsMatrixTier.query.order_by(PartsMatrixTier.min_cost.asc()).all()
+        tiers = parts_tiers()
         if not tiers:
-            return Decimal("1.3000")
+            return DEFAULT_PARTS_MULTIPLIER
 
-        for t in tiers:
-            min_c = D(t.min_cost)
-            max_c = D(t.max_cost) if t.max_cost is not None else None
+        for min_c, max_c, mult in tiers:
             if cost >= min_c and (max_c is None or cost <= max_c):
-                return D(t.multiplier)
+                return mult
+
+        return tiers[-1][2]
 
-        return D(tiers[-1].multiplier)
+    def page_before(q):
+        # keyset paging: ?before=<opened_at>&before_id=<id> of the last RO on the
+        # previous page. opened_at alone isn't unique (DATETIME is per second),
+        # so ties are broken on id, matching the ORDER BY in paged_ros().
+        v = (request.args.get("before") or "").strip()
+        if not v:
+            return q
+        try:
+            before = parse_iso(v)
+        except ValueError:
+            return q
+        before_id = (request.args.get("before_id") or "").strip()
+        return q.filter(or_(
+            RepairOrder.opened_at < before,
+            and_(RepairOrder.opened_at == before, RepairOrder.id < before_id),
+        ))
+
+    def paged_ros(q, page_size: int):
+        # one page of ROs, newest first, plus the cursor for the next page
+        ros = page_before(q).order_by(RepairOrder.opened_at.desc(), RepairOrder.id.desc()).limit(page_size).all()
+        next_page = None
+        if len(ros) == page_size:
+            next_page = {"before": ros[-1].opened_at.isoformat(), "before_id": ros[-1].id}
+        return ros, next_page
 
     # ---------- Root ----------
     @app.get("/")
@@ -266,40 +594,42 @@ def create_app():
         }
         ro_status = status_map.get(status_filter, "open")
         first_day = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        paid = Document.query.join(RepairOrder, Document.ro_id == RepairOrder.id).filter(
+        paid_total, paid_count = db.session.query(
+            func.coalesce(func.sum(Document.total), 0),
+            func.count(Document.id),
+        ).join(RepairOrder, Document.ro_id == RepairOrder.id).filter(
             Document.doc_type == "invoice",
             Document.status == "paid",
             Document.created_at >= first_day,
             RepairOrder.deleted_at.is_(None),
-        ).all()
-        mtd_revenue = sum((D(d.total) for d in paid), start=Decimal("0.00")).quantize(Decimal("0.01"))
-        paid_count = len(paid)
-        aro = (mtd_revenue / paid_count).quantize(Decimal("0.01")) if paid_count else Decimal("0.00")
+        ).one()
+        mtd_revenue = D(paid_total).quantize(CENT)
+        aro = (mtd_revenue / paid_count).quantize(CENT) if paid_count else ZERO
 
-        ros = RepairOrder.query.filter(
+        q = RepairOrder.query.options(ro_list_cols).filter(
             RepairOrder.status == ro_status,
             RepairOrder.deleted_at.is_(None),
-        ).order_by(RepairOrder.opened_at.desc()).limit(24).all()
+        )
+        ros, next_page = paged_ros(q, DASHBOARD_PAGE_SIZE)
         cust_ids = list({r.customer_id for r in ros})
         veh_ids = list({r.vehicle_id for r in ros})
-        customers = Customer.query.filter(Customer.id.in_(cust_ids)).all() if cust_ids else []
-        vehicles = Vehicle.query.filter(Vehicle.id.in_(veh_ids)).all() if veh_ids else []
+        customers = Customer.query.options(customer_list_cols).filter(Customer.id.in_(cust_ids)).all() if cust_ids else []
+        vehicles = Vehicle.query.options(vehicle_list_cols).filter(Vehicle.id.in_(veh_ids)).all() if veh_ids else []
         cust_map = {str(c.id): c for c in customers}
         veh_map = {str(v.id): v for v in vehicles}
 
         ro_ids = [r.id for r in ros]
-        docs = Document.query.filter(Document.ro_id.in_(ro_ids)).all() if ro_ids else []
+        docs = Document.query.options(
+            load_only(Document.ro_id, Document.doc_type, Document.status, Document.total)
+        ).filter(Document.ro_id.in_(ro_ids)).all() if ro_ids else []
         est_map = {d.ro_id: d for d in docs if d.doc_type == "estimate"}
         inv_map = {d.ro_id: d for d in docs if d.doc_type == "invoice"}
 
-        sent_count = ROEvent.query.join(RepairOrder, ROEvent.ro_id == RepairOrder.id).filter(
-            ROEvent.event_type == "estimate_sent",
-            RepairOrder.deleted_at.is_(None),
-        ).count()
-        approved_count = ROEvent.query.join(RepairOrder, ROEvent.ro_id == RepairOrder.id).filter(
-            ROEvent.event_type == "approved",
-            RepairOrder.deleted_at.is_(None),
-        ).count()
+        event_counts = dict(db.session.query(ROEventCounter.event_type, ROEventCounter.count).filter(
+            ROEventCounter.event_type.in_(COUNTED_EVENTS),
+        ).all())
+        sent_count = event_counts.get("estimate_sent", 0)
+        approved_count = event_counts.get("approved", 0)
         close_ratio = round((approved_count / sent_count * 100), 1) if sent_count else 0.0
 
         return render_template(
@@ -314,6 +644,7 @@ def create_app():
             est_map=est_map,
             inv_map=inv_map,
             status_filter=status_filter,
+            next_page=next_page,
         )
 
 
@@ -340,13 +671,13 @@ def create_app():
 
         # Enrich with RO + customer + vehicle for the template without needing relationships
         ro_ids = list({j.ro_id for j in jobs})
-        ros = RepairOrder.query.filter(RepairOrder.id.in_(ro_ids)).all() if ro_ids else []
+        ros = RepairOrder.query.options(ro_list_cols).filter(RepairOrder.id.in_(ro_ids)).all() if ro_ids else []
         ro_map = {r.id: r for r in ros}
 
         cust_ids = list({r.customer_id for r in ros})
         veh_ids = list({r.vehicle_id for r in ros})
-        custs = Customer.query.filter(Customer.id.in_(cust_ids)).all() if cust_ids else []
-        vehs = Vehicle.query.filter(Vehicle.id.in_(veh_ids)).all() if veh_ids else []
+        custs = Customer.query.options(customer_list_cols).filter(Customer.id.in_(cust_ids)).all() if cust_ids else []
+        vehs = Vehicle.query.options(vehicle_list_cols).filter(Vehicle.id.in_(veh_ids)).all() if veh_ids else []
         cust_map = {c.id: c for c in custs}
         veh_map = {v.id: v for v in vehs}
 
@@ -370,63 +701,76 @@ def create_app():
     @app.post("/settings/matrices/labor/add")
     @login_required
     def matrices_labor_add():
-        min_hours = parse_decimal(request.form.get("min_hours")) or Decimal("0.00")
+        min_hours = parse_decimal(request.form.get("min_hours")) or ZERO
         max_hours = parse_decimal(request.form.get("max_hours"))  # may be None
-        rate = parse_decimal(request.form.get("rate_per_hour")) or Decimal("115.00")
+        rate = parse_decimal(request.form.get("rate_per_hour")) or DEFAULT_LABOR_RATE
         db.session.add(LaborMatrixTier(min_hours=min_hours, max_hours=max_hours, rate_per_hour=rate))
         db.session.commit()
+        invalidate_matrix_cache()
         return redirect(url_for("matrices_settings"))
 
     @app.post("/settings/matrices/parts/add")
     @login_required
     def matrices_parts_add():
-        min_cost = parse_decimal(request.form.get("min_cost")) or Decimal("0.00")
+        min_cost = parse_decimal(request.form.get("min_cost")) or ZERO
         max_cost = parse_decimal(request.form.get("max_cost"))  # may be None
-        mult = parse_decimal(request.form.get("multiplier")) or Decimal("1.3000")
+        mult = parse_decimal(request.form.get("multiplier")) or DEFAULT_PARTS_MULTIPLIER
         db.session.add(PartsMatrixTier(min_cost=min_cost, max_cost=max_cost, multiplier=mult))
         db.session.commit()
+        invalidate_matrix_cache()
         return redirect(url_for("matrices_settings"))
 
     @app.post("/settings/matrices/tier/<string:tier_id>/delete")
     @login_required
     def matrices_delete_tier(tier_id):
         # could be either table
-        t = LaborMatrixTier.query.get(tier_id)
+        t = db.session.get(LaborMatrixTier, tier_id)
         if t:
             db.session.delete(t)
             db.session.commit()
+            invalidate_matrix_cache()
             return redirect(url_for("matrices_settings"))
-        t2 = PartsMatrixTier.query.get_or_404(tier_id)
+        t2 = db.get_or_404(PartsMatrixTier, tier_id)
         db.session.delete(t2)
         db.session.commit()
+        invalidate_matrix_cache()
         return redirect(url_for("matrices_settings"))
 
     # ---------- Customers ----------
+    def customer_search_filter(q: str):
+        # Substring match can't use a b-tree index; both callers order by
+        # created_at with a LIMIT, so MySQL walks ix_customers_deleted_created
+        # newest-first and stops once enough rows match.
+        like = f"%{q}%"
+        return or_(Customer.name.like(like), Customer.phone.like(like), Customer.email.like(like))
+
     @app.get("/customers")
     @login_required
     def customers():
         q = (request.args.get("q") or "").strip()
         query = Customer.query.filter(Customer.deleted_at.is_(None))
         if q:
-            like = f"%{q}%"
-            query = query.filter(or_(Customer.name.like(like), Customer.phone.like(like), Customer.email.like(like)))
+            query = query.filter(customer_search_filter(q))
         rows = query.order_by(Customer.created_at.desc()).limit(300).all()
         return render_template("customers.html", customers=rows, q=q)
 
     @app.get("/customers/<string:customer_id>")
     @login_required
     def customer_detail(customer_id):
-        cust = Customer.query.get_or_404(customer_id)
+        cust = db.get_or_404(Customer, customer_id)
         vehicles = Vehicle.query.filter_by(customer_id=cust.id).all()
-        ros = RepairOrder.query.filter(
+        ros = RepairOrder.query.options(ro_list_cols).filter(
             RepairOrder.customer_id == cust.id,
             RepairOrder.deleted_at.is_(None),
         ).order_by(RepairOrder.opened_at.desc()).all()
 
         ro_ids = [r.id for r in ros]
-        invs = Document.query.filter(Document.doc_type == "invoice", Document.ro_id.in_(ro_ids)).all() if ro_ids else []
-        paid = [d for d in invs if d.status == "paid"]
-        total_revenue = sum((D(d.total) for d in paid), start=Decimal("0.00")).quantize(Decimal("0.01"))
+        paid_total = db.session.query(func.coalesce(func.sum(Document.total), 0)).filter(
+            Document.doc_type == "invoice",
+            Document.status == "paid",
+            Document.ro_id.in_(ro_ids),
+        ).scalar() if ro_ids else 0
+        total_revenue = D(paid_total).quantize(CENT)
 
         return render_template("customer_detail.html", cust=cust, vehicles=vehicles, ros=ros, total_revenue=total_revenue)
 
@@ -437,10 +781,9 @@ def create_app():
         q = (request.args.get("q") or "").strip()
         if not q or len(q) < 2:
             return {"results": []}
-        like = f"%{q}%"
         rows = Customer.query.filter(
             Customer.deleted_at.is_(None),
-            or_(Customer.name.like(like), Customer.phone.like(like), Customer.email.like(like)),
+            customer_search_filter(q),
         ).order_by(Customer.created_at.desc()).limit(10).all()
 
         return {"results": [{
@@ -467,6 +810,24 @@ def create_app():
         } for v in rows]}
 
     # ---------- API: NHTSA make/model ----------
+    # Make/model lists for a year barely ever change; keep them per worker.
+    nhtsa_cache = {}
+
+    def nhtsa_names(url: str, field: str):
+        hit = nhtsa_cache.get(url)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+        r = NHTSA.get(url, timeout=10)
+        data = r.json()
+        results = data.get("results") or data.get("Results") or []
+        lo, hi = field, field.capitalize()
+        names = sorted({n for x in results if (n := _norm(x, lo, hi))})
+        if r.ok:
+            if len(nhtsa_cache) >= NHTSA_CACHE_MAX:
+                nhtsa_cache.clear()
+            nhtsa_cache[url] = (time.monotonic() + NHTSA_CACHE_TTL, names)
+        return names
+
     @app.get("/api/vehicle/makes")
     @login_required
     def api_vehicle_makes():
@@ -474,11 +835,7 @@ def create_app():
         if not year.isdigit():
             return {"results": []}
         url = f"https://api.nhtsa.gov/products/vehicle/makes?modelYear={year}&issueType=r"
-        r = requests.get(url, timeout=10)
-        data = r.json()
-        results = data.get("results") or data.get("Results") or []
-        makes = sorted({(x.get("make") or x.get("Make") or "").strip() for x in results if (x.get("make") or x.get("Make"))})
-        return {"results": makes}
+        return {"results": nhtsa_names(url, "make")}
 
     @app.get("/api/vehicle/models")
     @login_required
@@ -488,11 +845,7 @@ def create_app():
         if not year.isdigit() or not make:
             return {"results": []}
         url = f"https://api.nhtsa.gov/products/vehicle/models?modelYear={year}&make={make}&issueType=r"
-        r = requests.get(url, timeout=10)
-        data = r.json()
-        results = data.get("results") or data.get("Results") or []
-        models = sorted({(x.get("model") or x.get("Model") or "").strip() for x in results if (x.get("model") or x.get("Model"))})
-        return {"results": models}
+        return {"results": nhtsa_names(url, "model")}
 
 
 
@@ -500,11 +853,11 @@ def create_app():
     @app.get("/calendar")
     @login_required
     def calendar_view():
-        ros = RepairOrder.query.filter(RepairOrder.deleted_at.is_(None)).order_by(RepairOrder.opened_at.desc()).limit(200).all()
+        ros = RepairOrder.query.options(ro_list_cols).filter(RepairOrder.deleted_at.is_(None)).order_by(RepairOrder.opened_at.desc()).limit(200).all()
         cust_ids = list({r.customer_id for r in ros})
         veh_ids = list({r.vehicle_id for r in ros})
-        customers = Customer.query.filter(Customer.id.in_(cust_ids)).all() if cust_ids else []
-        vehicles = Vehicle.query.filter(Vehicle.id.in_(veh_ids)).all() if veh_ids else []
+        customers = Customer.query.options(customer_list_cols).filter(Customer.id.in_(cust_ids)).all() if cust_ids else []
+        vehicles = Vehicle.query.options(vehicle_list_cols).filter(Vehicle.id.in_(veh_ids)).all() if veh_ids else []
         cust_map = {c.id: c for c in customers}
         veh_map = {v.id: v for v in vehicles}
         ro_pick = []
@@ -532,26 +885,36 @@ def create_app():
 
     def calendar_events(start=None, end=None):
         q = Appointment.query
-        if start:
-            try:
-                dt = datetime.fromisoformat(start.replace("Z",""))
-                q = q.filter(Appointment.start_at >= dt)
-            except Exception:
-                pass
-        if end:
-            try:
-                dt = datetime.fromisoformat(end.replace("Z",""))
-                q = q.filter(Appointment.end_at <= dt)
-            except Exception:
-                pass
+        try:
+            if start:
+                q = q.filter(Appointment.start_at >= parse_iso(start))
+        except ValueError:
+            pass
+        try:
+            if end:
+                q = q.filter(Appointment.end_at <= parse_iso(end))
+        except ValueError:
+            pass
         appts = q.order_by(Appointment.start_at.asc()).limit(2000).all()
+
+        ro_ids = list({a.ro_id for a in appts})
+        ros = RepairOrder.query.options(ro_list_cols).filter(RepairOrder.id.in_(ro_ids)).all() if ro_ids else []
+        ro_map = {r.id: r for r in ros}
+
+        cust_ids = list({r.customer_id for r in ros})
+        veh_ids = list({r.vehicle_id for r in ros})
+        custs = Customer.query.options(customer_list_cols).filter(Customer.id.in_(cust_ids)).all() if cust_ids else []
+        vehs = Vehicle.query.options(vehicle_list_cols).filter(Vehicle.id.in_(veh_ids)).all() if veh_ids else []
+        cust_map = {c.id: c for c in custs}
+        veh_map = {v.id: v for v in vehs}
+
         events = []
         for a in appts:
-            ro = RepairOrder.query.get(a.ro_id)
+            ro = ro_map.get(a.ro_id)
             title = a.title
             if ro:
-                cust = Customer.query.get(ro.customer_id)
-                veh = Vehicle.query.get(ro.vehicle_id)
+                cust = cust_map.get(ro.customer_id)
+                veh = veh_map.get(ro.vehicle_id)
                 parts = [f"RO #{ro.ro_number}"]
                 if cust and cust.name:
                     parts.append(cust.name)
@@ -590,7 +953,7 @@ def create_app():
     @app.get("/api/calendar/event/<string:appt_id>")
     @login_required
     def api_calendar_event(appt_id):
-        appt = Appointment.query.get_or_404(appt_id)
+        appt = db.get_or_404(Appointment, appt_id)
         return jsonify({
             "id": appt.id,
             "title": appt.title,
@@ -611,12 +974,12 @@ def create_app():
 
         if not ro_id:
             abort(400)
-        RepairOrder.query.get_or_404(ro_id)
+        db.get_or_404(RepairOrder, ro_id)
 
         try:
-            sdt = datetime.fromisoformat(start_at.replace("Z",""))
-            edt = datetime.fromisoformat(end_at.replace("Z",""))
-        except Exception:
+            sdt = parse_iso(start_at)
+            edt = parse_iso(end_at)
+        except ValueError:
             abort(400)
 
         appt = Appointment(
@@ -645,7 +1008,7 @@ def create_app():
         return {"ok": True, "id": appt.id}
 
     def update_appointment_from_form(appt_id):
-        appt = Appointment.query.get_or_404(appt_id)
+        appt = db.get_or_404(Appointment, appt_id)
         title = (request.form.get("title") or "").strip()
         start_at = (request.form.get("start_at") or "").strip()
         end_at = (request.form.get("end_at") or "").strip()
@@ -654,9 +1017,9 @@ def create_app():
         if title:
             appt.title = title
         if start_at:
-            appt.start_at = datetime.fromisoformat(start_at.replace("Z",""))
+            appt.start_at = parse_iso(start_at)
         if end_at:
-            appt.end_at = datetime.fromisoformat(end_at.replace("Z",""))
+            appt.end_at = parse_iso(end_at)
         appt.notes = notes
         db.session.add(appt)
         db.session.commit()
@@ -675,7 +1038,7 @@ def create_app():
         return {"ok": True}
 
     def delete_appointment(appt_id):
-        appt = Appointment.query.get_or_404(appt_id)
+        appt = db.get_or_404(Appointment, appt_id)
         db.session.delete(appt)
         db.session.commit()
         return {"ok": True}
@@ -695,19 +1058,20 @@ def create_app():
     @login_required
     def ro_list():
         status = (request.args.get("status") or "all").strip()
-        q = RepairOrder.query.filter(RepairOrder.deleted_at.is_(None))
+        q = RepairOrder.query.options(ro_list_cols).filter(RepairOrder.deleted_at.is_(None))
         if status != "all":
             q = q.filter(RepairOrder.status == status)
-        ros = q.order_by(RepairOrder.opened_at.desc()).limit(400).all()
+        ros, next_page = paged_ros(q, RO_LIST_PAGE_SIZE)
 
         cust_ids = list({r.customer_id for r in ros})
         veh_ids = list({r.vehicle_id for r in ros})
-        customers = Customer.query.filter(Customer.id.in_(cust_ids)).all() if cust_ids else []
-        vehicles = Vehicle.query.filter(Vehicle.id.in_(veh_ids)).all() if veh_ids else []
+        customers = Customer.query.options(customer_list_cols).filter(Customer.id.in_(cust_ids)).all() if cust_ids else []
+        vehicles = Vehicle.query.options(vehicle_list_cols).filter(Vehicle.id.in_(veh_ids)).all() if veh_ids else []
         cust_map = {c.id: c for c in customers}
         veh_map = {v.id: v for v in vehicles}
 
-        return render_template("ro_list.html", ros=ros, status=status, cust_map=cust_map, veh_map=veh_map)
+        return render_template("ro_list.html", ros=ros, status=status, cust_map=cust_map, veh_map=veh_map,
+                               next_page=next_page)
 
     # ---------- RO create ----------
     @app.get("/ros/new", endpoint="ro_new")
@@ -722,7 +1086,7 @@ def create_app():
         existing_vehicle_id = (request.form.get("existing_vehicle_id") or "").strip() or None
 
         if existing_customer_id:
-            cust = Customer.query.get_or_404(existing_customer_id)
+            cust = db.get_or_404(Customer, existing_customer_id)
             cust.name = (request.form.get("customer_name") or cust.name).strip()
             cust.phone = (request.form.get("customer_phone") or cust.phone or "").strip() or None
             cust.email = (request.form.get("customer_email") or cust.email or "").strip() or None
@@ -753,7 +1117,7 @@ def create_app():
             return int(v) if v.isdigit() else None
 
         if existing_vehicle_id:
-            veh = Vehicle.query.get_or_404(existing_vehicle_id)
+            veh = db.get_or_404(Vehicle, existing_vehicle_id)
         else:
             veh = Vehicle(
                 customer_id=cust.id,
@@ -767,9 +1131,8 @@ def create_app():
             db.session.add(veh)
             db.session.flush()
 
-        last_num = db.session.query(func.max(RepairOrder.ro_number)).scalar() or 1000
         ro = RepairOrder(
-            ro_number=last_num + 1,
+            ro_number=next_ro_number(),
             customer_id=cust.id,
             vehicle_id=veh.id,
             status="open",
@@ -793,61 +1156,68 @@ def create_app():
     @login_required
     def ro_detail(ro_id):
         tab = (request.args.get("tab") or "estimate").strip().lower()
-        if tab not in ("estimate", "invoice", "activity", "wip"):
+        if tab not in RO_DETAIL_TABS:
             tab = "estimate"
 
-        ro = RepairOrder.query.get_or_404(ro_id)
-        customer = Customer.query.get_or_404(ro.customer_id)
-        vehicle = Vehicle.query.get_or_404(ro.vehicle_id)
-
-        estimate = get_or_create_doc(ro.id, "estimate")
-        invoice = get_or_create_doc(ro.id, "invoice")
+        state = ro_detail_etag(ro_id)
+        if state is None:
+            abort(404)
+        etag, tech_version = state
+        # a pending flash() has to be rendered, so never answer 304 then
+        if etag in request.if_none_match and not session.get("_flashes"):
+            resp = app.response_class(status=304)
+            resp.set_etag(etag)
+            resp.headers["Cache-Control"] = "private, no-cache"
+            return resp
+
+        estimate = get_or_create_doc(ro_id, "estimate")
+        invoice = get_or_create_doc(ro_id, "invoice")
         ensure_share_token(estimate)
         ensure_share_token(invoice)
 
-        ensure_default_job(ro.id)
-
-        jobs = Job.query.filter_by(ro_id=ro.id).order_by(Job.sort_order.asc(), Job.created_at.asc()).all()
-        technicians = Technician.query.order_by(Technician.name.asc()).all()
-
-
-
-        recalc_document_totals(estimate)
-        recalc_document_totals(invoice)
+        ensure_default_job(ro_id)
+        # unconditional: the helpers' queries autoflush, so a pending share
+        # token may no longer show up in session.dirty here
         db.session.commit()
+        # the tag sent with the page has to describe the state after the
+        # writes above (new documents, share tokens, default job)
+        etag, tech_version = ro_detail_etag(ro_id)
+
+        # the commit expired everything; load the whole RO graph in one go
+        ro = load_ro(
+            ro_id,
+            selectinload(RepairOrder.jobs),
+            selectinload(RepairOrder.documents).selectinload(Document.line_items),
+        )
+        customer = ro.customer
+        vehicle = ro.vehicle
+        jobs = ro.jobs
+        technicians = tech_options(tech_version)
 
-        est_items = LineItem.query.filter_by(document_id=estimate.id).order_by(LineItem.created_at.asc()).all()
-        inv_items = LineItem.query.filter_by(document_id=invoice.id).order_by(LineItem.created_at.asc()).all()
-
-        def group_items(items):
-            grouped = {}
-            unassigned = []
-            for li in items:
-                if li.job_id:
-                    grouped.setdefault(li.job_id, []).append(li)
-                else:
-                    unassigned.append(li)
-            return grouped, unassigned
+        est_items = estimate.line_items
+        inv_items = invoice.line_items
+        est_totals = compute_document_totals(estimate, est_items, jobs)
+        inv_totals = compute_document_totals(invoice, inv_items, jobs)
 
         est_items_by_job, est_unassigned_items = group_items(est_items)
         inv_items_by_job, inv_unassigned_items = group_items(inv_items)
 
-        est_job_totals = job_totals(estimate.id)
-        inv_job_totals = job_totals(invoice.id)
-        job_labor_hours = {j.id: labor_hours_for_job(estimate.id, j.id) for j in jobs}
+        est_job_totals, job_labor_hours = totals_by_job(est_items)
+        inv_job_totals, _ = totals_by_job(inv_items)
 
-        est_profit = calc_profit_for_doc(estimate.id)
-        inv_profit = calc_profit_for_doc(invoice.id)
+        profits = profit_for_docs([estimate.id, invoice.id])
+        est_profit, inv_profit = profits[estimate.id], profits[invoice.id]
 
         events = ROEvent.query.filter_by(ro_id=ro.id).order_by(ROEvent.created_at.desc()).limit(80).all()
 
         est_share_url = url_for("share_view", token=estimate.share_token, _external=True)
         inv_share_url = url_for("share_view", token=invoice.share_token, _external=True)
 
-        return render_template(
+        resp = make_response(render_template(
             "ro_detail.html",
             ro=ro, customer=customer, vehicle=vehicle,
             estimate=estimate, invoice=invoice,
+            est_totals=est_totals, inv_totals=inv_totals,
             jobs=jobs,
             est_items=est_items, inv_items=inv_items,
             est_items_by_job=est_items_by_job,
@@ -862,38 +1232,51 @@ def create_app():
             technicians=technicians,
             job_labor_hours=job_labor_hours,
             active_tab=tab,
-        )
+        ))
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
 
     @app.post("/ros/<string:ro_id>/status")
     @login_required
     def ro_change_status(ro_id):
-        ro = RepairOrder.query.get_or_404(ro_id)
+        tab = request.form.get("return_tab") or "estimate"
+        old = db.session.query(RepairOrder.status).filter_by(id=ro_id).scalar()
+        if old is None:
+            abort(404)
         new_status = (request.form.get("status") or "").strip()
-        if new_status not in ("open", "estimate_sent", "work_in_progress", "closed", "canceled"):
+        if new_status not in RO_STATUSES:
             flash("Invalid status.")
-            return redirect(url_for("ro_detail", ro_id=ro.id, tab=request.form.get("return_tab") or "estimate"))
-
-        old = ro.status
-        ro.status = new_status
-        if new_status == "closed" and ro.closed_at is None:
-            ro.closed_at = datetime.utcnow()
-        if new_status != "closed":
-            ro.closed_at = None
-
-        db.session.add(ro)
-        log_event(ro.id, "ro_status", old, new_status)
-        db.session.commit()
+            return redirect(url_for("ro_detail", ro_id=ro_id, tab=tab))
+
+        # keep the first close time; leaving "closed" clears it. Re-submitting
+        # the current status matches no row, so it writes and logs nothing.
+        closed_at = func.coalesce(RepairOrder.closed_at, datetime.utcnow()) if new_status == "closed" else None
+        res = db.session.execute(
+            update(RepairOrder)
+            .where(RepairOrder.id == ro_id, RepairOrder.status != new_status)
+            .values(status=new_status, closed_at=closed_at)
+        )
+        if res.rowcount:
+            log_event(ro_id, "ro_status", old, new_status)
+            db.session.commit()
 
-        return redirect(url_for("ro_detail", ro_id=ro.id, tab=request.form.get("return_tab") or "estimate"))
+        return redirect(url_for("ro_detail", ro_id=ro_id, tab=tab))
 
     @app.post("/ros/<string:ro_id>/delete")
     @login_required
     def ro_delete(ro_id):
-        ro = RepairOrder.query.get_or_404(ro_id)
+        ro = db.get_or_404(RepairOrder, ro_id)
         if ro.deleted_at is None:
             ro.deleted_at = datetime.utcnow()
             db.session.add(ro)
             log_event(ro.id, "ro_deleted", None, ro.deleted_at.isoformat())
+            # archived ROs no longer count toward the dashboard close ratio
+            for event_type, n in db.session.query(ROEvent.event_type, func.count(ROEvent.id)).filter(
+                ROEvent.ro_id == ro.id,
+                ROEvent.event_type.in_(COUNTED_EVENTS),
+            ).group_by(ROEvent.event_type).all():
+                bump_event_counter(event_type, -n)
             db.session.commit()
         flash("Repair order archived.")
         return redirect(url_for("ro_list"))
@@ -901,7 +1284,7 @@ def create_app():
     @app.post("/customers/<string:customer_id>/delete")
     @login_required
     def customer_delete(customer_id):
-        cust = Customer.query.get_or_404(customer_id)
+        cust = db.get_or_404(Customer, customer_id)
         if cust.deleted_at is None:
             cust.deleted_at = datetime.utcnow()
             db.session.add(cust)
@@ -912,13 +1295,14 @@ def create_app():
     @app.post("/jobs/<string:job_id>/status")
     @login_required
     def job_set_status(job_id):
-        job = Job.query.get_or_404(job_id)
-        ro = RepairOrder.query.get_or_404(job.ro_id)
+        tab = request.form.get("return_tab") or "estimate"
+        job = db.get_or_404(Job, job_id)
+        ro = db.get_or_404(RepairOrder, job.ro_id)
 
         new_status = (request.form.get("status") or "").strip()
-        if new_status not in ("pending", "approved", "work_in_progress", "completed", "declined"):
+        if new_status not in JOB_STATUSES:
             flash("Invalid job status.")
-            return redirect(url_for("ro_detail", ro_id=ro.id, tab=request.form.get("return_tab") or "estimate"))
+            return redirect(url_for("ro_detail", ro_id=ro.id, tab=tab))
 
         old = job.status
         job.status = new_status
@@ -926,6 +1310,8 @@ def create_app():
             job.completed_at = datetime.utcnow()
         db.session.add(job)
         log_event(ro.id, "job_status", f"{job.title}:{old}", f"{job.title}:{new_status}")
+        if "declined" in (old, new_status):
+            persist_ro_totals(ro.id)
 
         # Optional convenience: if ANY job is approved/WIP, set RO to WIP
         if new_status in ("approved", "work_in_progress") and ro.status in ("open", "estimate_sent"):
@@ -933,23 +1319,24 @@ def create_app():
             db.session.add(ro)
 
         if new_status == "completed":
-            remaining = Job.query.filter_by(ro_id=ro.id).filter(Job.status != "completed").count()
-            if remaining == 0:
-                ro.status = "closed"
-                ro.closed_at = datetime.utcnow()
-                db.session.add(ro)
-                log_event(ro.id, "ro_completed", None, ro.closed_at.isoformat())
+            close_ro_if_jobs_done(ro.id)
 
         db.session.commit()
-        return redirect(url_for("ro_detail", ro_id=ro.id, tab=request.form.get("return_tab") or "estimate"))
+        return redirect(url_for("ro_detail", ro_id=ro.id, tab=tab))
 
     # ---------- Jobs ----------
     @app.post("/ros/<string:ro_id>/jobs/add")
     @login_required
     def job_add(ro_id):
         title = (request.form.get("title") or "").strip() or "New Job"
-        max_sort = db.session.query(func.max(Job.sort_order)).filter(Job.ro_id == ro_id).scalar() or 0
-        db.session.add(Job(ro_id=ro_id, title=title, status="pending", sort_order=max_sort + 1))
+        # next sort_order is computed inside the INSERT so concurrent adds can't share one
+        db.session.execute(insert(Job).from_select(
+            ["ro_id", "title", "status", "sort_order"],
+            select(
+                literal(ro_id), literal(title), literal("pending"),
+                func.coalesce(func.max(Job.sort_order), 0) + 1,
+            ).where(Job.ro_id == ro_id),
+        ))
         log_event(ro_id, "job_added", None, title)
         db.session.commit()
         return redirect(url_for("ro_detail", ro_id=ro_id, tab=request.form.get("return_tab") or "estimate"))
@@ -959,68 +1346,69 @@ def create_app():
     @app.post("/jobs/<string:job_id>/edit")
     @login_required
     def job_edit(job_id):
-        job = Job.query.get_or_404(job_id)
-        ro = RepairOrder.query.get_or_404(job.ro_id)
+        tab = request.form.get("return_tab") or "estimate"
+        row = db.session.query(Job.ro_id, Job.title).filter_by(id=job_id).first()
+        if row is None:
+            abort(404)
+        ro_id, old = row
         title = (request.form.get("title") or "").strip()
         if not title:
             flash("Job name is required.")
-            return redirect(url_for("ro_detail", ro_id=ro.id, tab=request.form.get("return_tab") or "estimate"))
-        old = job.title
-        job.title = title
-        db.session.add(job)
-        log_event(ro.id, "job_renamed", old, title)
+            return redirect(url_for("ro_detail", ro_id=ro_id, tab=tab))
+        db.session.execute(update(Job).where(Job.id == job_id).values(title=title))
+        log_event(ro_id, "job_renamed", old, title)
         db.session.commit()
-        return redirect(url_for("ro_detail", ro_id=ro.id, tab=request.form.get("return_tab") or "estimate"))
+        return redirect(url_for("ro_detail", ro_id=ro_id, tab=tab))
 
     @app.post("/jobs/<string:job_id>/delete")
     @login_required
     def job_delete(job_id):
-        job = Job.query.get_or_404(job_id)
+        job = db.get_or_404(Job, job_id)
         ro_id = job.ro_id
 
         # Prevent deleting if it would orphan existing line items: move them to None-job bucket
-        items = LineItem.query.filter_by(job_id=job.id).all()
-        for li in items:
-            li.job_id = None
-            db.session.add(li)
+        db.session.execute(update(LineItem).where(LineItem.job_id == job.id).values(job_id=None))
 
+        was_declined = job.status == "declined"
         db.session.delete(job)
         log_event(ro_id, "job_deleted", job_id, None)
+        if was_declined:
+            # its lines are back in the unassigned bucket and count again
+            persist_ro_totals(ro_id)
         db.session.commit()
         return redirect(url_for("ro_detail", ro_id=ro_id, tab=request.form.get("return_tab") or "estimate"))
 
     @app.post("/jobs/<string:job_id>/complete")
     @login_required
     def job_complete(job_id):
-        job = Job.query.get_or_404(job_id)
-        ro = RepairOrder.query.get_or_404(job.ro_id)
+        job = db.get_or_404(Job, job_id)
+        ro = db.get_or_404(RepairOrder, job.ro_id)
         tech_id = (request.form.get("tech_id") or "").strip() or None
 
         if tech_id:
             job.tech_id = tech_id
 
+        was_declined = job.status == "declined"
         if job.status != "completed":
             job.status = "completed"
             job.completed_at = datetime.utcnow()
             log_event(ro.id, "job_completed", None, job.title)
+        if was_declined:
+            # its lines count toward the totals again
+            persist_ro_totals(ro.id)
 
         estimate = get_or_create_doc(ro.id, "estimate")
         hours = labor_hours_for_job(estimate.id, job.id)
 
         if tech_id and hours > 0:
-            tech = Technician.query.get(tech_id)
+            tech = db.session.get(Technician, tech_id)
             if tech:
                 tech.total_hours = D(tech.total_hours) + hours
                 db.session.add(tech)
 
         db.session.add(job)
 
-        remaining = Job.query.filter_by(ro_id=ro.id).filter(Job.status != "completed").count()
-        if remaining == 0:
-            ro.status = "closed"
-            ro.closed_at = datetime.utcnow()
-            db.session.add(ro)
-            log_event(ro.id, "ro_completed", None, ro.closed_at.isoformat())
+        close_ro_if_jobs_done(ro.id)
 
         db.session.commit()
         return redirect(url_for("ro_detail", ro_id=ro.id, tab="wip"))
@@ -1040,14 +1428,15 @@ def create_app():
     @app.post("/docs/<string:doc_id>/items/add")
     @login_required
     def add_line_item(doc_id):
-        doc = Document.query.get_or_404(doc_id)
+        tab = request.form.get("return_tab") or "estimate"
+        doc = db.get_or_404(Document, doc_id)
 
         if doc.status in ("locked", "paid") or doc.locked_at is not None:
             flash("Document is locked.")
             return redirect(url_for(
                 "ro_detail",
                 ro_id=doc.ro_id,
-                tab=request.form.get("return_tab") or "estimate"
+                tab=tab
             ))
 
         # Always normalize once
@@ -1064,7 +1453,7 @@ def create_app():
         cost_in = None
         hours_in = None
         unit_price_in = None
-        unit_price = Decimal("0.00")
+        unit_price = ZERO
 
         # ---------------- LABOR ----------------
         if item_type == "labor":
@@ -1074,7 +1463,7 @@ def create_app():
 
             if hours_in is None:
                 flash("Labor requires hours.")
-                return redirect(url_for("ro_detail", ro_id=doc.ro_id, tab=request.form.get("return_tab") or "estimate"))
+                return redirect(url_for("ro_detail", ro_id=doc.ro_id, tab=tab))
 
             qty = Decimal(hours_in)  # qty = hours
             rate = get_labor_rate_for_hours(qty)  # qty already hours
@@ -1089,13 +1478,13 @@ def create_app():
 
             if cost_in is None:
                 flash("Parts require cost.")
-                return redirect(url_for("ro_detail", ro_id=doc.ro_id, tab=request.form.get("return_tab") or "estimate"))
+                return redirect(url_for("ro_detail", ro_id=doc.ro_id, tab=tab))
 
             multiplier = get_parts_multiplier_for_cost(Decimal(cost_in))
 
             # Matrix if no override price
             if unit_price_in is None:
-                unit_price = (Decimal(cost_in) * Decimal(multiplier)).quantize(Decimal("0.01"))
+                unit_price = (Decimal(cost_in) * Decimal(multiplier)).quantize(CENT)
             else:
                 unit_price = unit_price_in
 
@@ -1108,7 +1497,7 @@ def create_app():
 
             if unit_price_in is None:
                 flash("Fee requires a unit price.")
-                return redirect(url_for("ro_detail", ro_id=doc.ro_id, tab=request.form.get("return_tab") or "estimate"))
+                return redirect(url_for("ro_detail", ro_id=doc.ro_id, tab=tab))
 
             unit_price = unit_price_in
             # taxable checkbox decides
@@ -1120,7 +1509,7 @@ def create_app():
 
             if unit_price_in is None:
                 flash("Discount requires an amount.")
-                return redirect(url_for("ro_detail", ro_id=doc.ro_id, tab=request.form.get("return_tab") or "estimate"))
+                return redirect(url_for("ro_detail", ro_id=doc.ro_id, tab=tab))
 
             unit_price = abs(unit_price_in) * Decimal("-1.00")
             taxable = False
@@ -1130,7 +1519,7 @@ def create_app():
             return redirect(url_for(
                 "ro_detail",
                 ro_id=doc.ro_id,
-                tab=request.form.get("return_tab") or "estimate"
+                tab=tab
             ))
 
         li = LineItem(
@@ -1146,15 +1535,13 @@ def create_app():
         )
 
         db.session.add(li)
-        db.session.commit()
-
-        recalc_document_totals(doc)
+        persist_document_totals(doc)  # autoflushes the new line first
         db.session.commit()
 
         return redirect(url_for(
             "ro_detail",
             ro_id=doc.ro_id,
-            tab=request.form.get("return_tab") or "estimate"
+            tab=tab
         ))
 
 
@@ -1162,17 +1549,15 @@ def create_app():
     @app.post("/items/<string:item_id>/delete")
     @login_required
     def delete_item(item_id):
-        li = LineItem.query.get_or_404(item_id)
-        doc = Document.query.get_or_404(li.document_id)
+        li = db.get_or_404(LineItem, item_id)
+        doc = db.get_or_404(Document, li.document_id)
 
         if doc.status in ("locked", "paid") or doc.locked_at is not None:
             flash("Document is locked.")
             return redirect(url_for("ro_detail", ro_id=doc.ro_id, tab="invoice" if doc.doc_type == "invoice" else "estimate"))
 
         db.session.delete(li)
-        db.session.commit()
-
-        recalc_document_totals(doc)
+        persist_document_totals(doc)
         db.session.commit()
 
         tab = (request.form.get("return_tab") or ("invoice" if doc.doc_type == "invoice" else "estimate")).strip().lower()
@@ -1183,8 +1568,8 @@ def create_app():
     @app.post("/items/<string:item_id>/edit")
     @login_required
     def edit_item(item_id):
-        li = LineItem.query.get_or_404(item_id)
-        doc = Document.query.get_or_404(li.document_id)
+        li = db.get_or_404(LineItem, item_id)
+        doc = db.get_or_404(Document, li.document_id)
 
         if doc.status in ("locked", "paid") or doc.locked_at is not None:
             flash("Document is locked.")
@@ -1216,9 +1601,7 @@ def create_app():
             li.labor_hours = hours_in
 
         db.session.add(li)
-        db.session.commit()
-
-        recalc_document_totals(doc)
+        persist_document_totals(doc)  # autoflushes the edit first
         db.session.commit()
 
         tab = (request.form.get("return_tab") or ("invoice" if doc.doc_type == "invoice" else "estimate")).strip().lower()
@@ -1229,14 +1612,14 @@ def create_app():
     @app.post("/docs/<string:doc_id>/lock")
     @login_required
     def lock_document(doc_id):
-        doc = Document.query.get_or_404(doc_id)
-        recalc_document_totals(doc)
+        doc = db.get_or_404(Document, doc_id)
+        persist_document_totals(doc)
 
         if doc.doc_type == "estimate":
             doc.sent_at = datetime.utcnow()
             doc.status = "sent"
             log_event(doc.ro_id, "estimate_sent", None, doc.id)
-            ro = RepairOrder.query.get_or_404(doc.ro_id)
+            ro = db.get_or_404(RepairOrder, doc.ro_id)
             if ro.status == "open":
                 ro.status = "estimate_sent"
                 db.session.add(ro)
@@ -1252,16 +1635,16 @@ def create_app():
     @app.post("/docs/<string:doc_id>/share")
     @login_required
     def share_document(doc_id):
-        doc = Document.query.get_or_404(doc_id)
+        doc = db.get_or_404(Document, doc_id)
         ensure_share_token(doc)
-        recalc_document_totals(doc)
+        persist_document_totals(doc)
 
         if doc.doc_type == "estimate":
             if doc.sent_at is None:
                 doc.sent_at = datetime.utcnow()
             doc.status = "sent"
             log_event(doc.ro_id, "estimate_sent", None, doc.id)
-            ro = RepairOrder.query.get_or_404(doc.ro_id)
+            ro = db.get_or_404(RepairOrder, doc.ro_id)
             if ro.status == "open":
                 ro.status = "estimate_sent"
                 db.session.add(ro)
@@ -1274,7 +1657,7 @@ def create_app():
     @app.post("/docs/<string:doc_id>/approve")
     @login_required
     def approve_estimate(doc_id):
-        est = Document.query.get_or_404(doc_id)
+        est = db.get_or_404(Document, doc_id)
         if est.doc_type != "estimate":
             abort(400)
 
@@ -1282,7 +1665,7 @@ def create_app():
         db.session.add(est)
         log_event(est.ro_id, "approved", None, est.id)
 
-        ro = RepairOrder.query.get_or_404(est.ro_id)
+        ro = db.get_or_404(RepairOrder, est.ro_id)
         ro.status = "work_in_progress"
         db.session.add(ro)
 
@@ -1297,21 +1680,20 @@ def create_app():
             return redirect(url_for("ro_detail", ro_id=ro.id, tab="invoice"))
 
         LineItem.query.filter_by(document_id=invoice.id).delete()
-        for i in LineItem.query.filter_by(document_id=est.id).all():
-            db.session.add(LineItem(
-                document_id=invoice.id,
-                job_id=i.job_id,
-                item_type=i.item_type,
-                description=i.description,
-                qty=i.qty,
-                unit_price=i.unit_price,
-                taxable=i.taxable,
-                labor_hours=i.labor_hours,
-                cost=i.cost,
-            ))
+        # copy the estimate lines as plain rows in one executemany INSERT;
+        # ids are generated client-side, so INSERT ... SELECT isn't an option.
+        # render_nulls keeps lines without a job/hours/cost in the same batch
+        copy_cols = ("job_id", "item_type", "description", "qty", "unit_price", "taxable", "labor_hours", "cost")
+        rows = db.session.execute(
+            select(*(getattr(LineItem, c) for c in copy_cols)).where(LineItem.document_id == est.id)
+        ).mappings().all()
+        if rows:
+            db.session.execute(
+                insert(LineItem).execution_options(render_nulls=True),
+                [dict(r, document_id=invoice.id) for r in rows],
+            )
 
-        db.session.commit()
-        recalc_document_totals(invoice)
+        persist_document_totals(invoice)
         db.session.commit()
 
         return redirect(url_for("ro_detail", ro_id=ro.id, tab="invoice"))
@@ -1319,21 +1701,24 @@ def create_app():
     @app.post("/docs/<string:doc_id>/decline")
     @login_required
     def decline_estimate(doc_id):
-        doc = Document.query.get_or_404(doc_id)
-        if doc.doc_type != "estimate":
+        row = db.session.query(Document.ro_id, Document.doc_type).filter_by(id=doc_id).first()
+        if row is None:
+            abort(404)
+        if row.doc_type != "estimate":
             abort(400)
-        doc.status = "declined"
-        db.session.add(doc)
-        log_event(doc.ro_id, "declined", None, doc.id)
+        db.session.execute(update(Document).where(Document.id == doc_id).values(status="declined"))
+        log_event(row.ro_id, "declined", None, doc_id)
         db.session.commit()
-        return redirect(url_for("ro_detail", ro_id=doc.ro_id, tab="estimate"))
+        return redirect(url_for("ro_detail", ro_id=row.ro_id, tab="estimate"))
 
     @app.post("/docs/<string:doc_id>/mark_paid")
     @login_required
     def mark_invoice_paid(doc_id):
-        doc = Document.query.get_or_404(doc_id)
+        doc = db.get_or_404(Document, doc_id)
         if doc.doc_type != "invoice":
             abort(400)
+        # revenue reports read the stored total once it's paid, so settle it first
+        persist_document_totals(doc)
         doc.status = "paid"
         db.session.add(doc)
         log_event(doc.ro_id, "paid", None, doc.id)
@@ -1343,31 +1728,16 @@ def create_app():
     # ---------- Share ----------
     @app.get("/share/<string:token>")
     def share_view(token):
-        doc = Document.query.filter_by(share_token=token).first_or_404()
-        ro = RepairOrder.query.get_or_404(doc.ro_id)
-        cust = Customer.query.get_or_404(ro.customer_id)
-        veh = Vehicle.query.get_or_404(ro.vehicle_id)
-
-        items = LineItem.query.filter_by(document_id=doc.id).order_by(LineItem.created_at.asc()).all()
-        recalc_document_totals(doc)
-        db.session.commit()
-
-        def group_items(items):
-            grouped = {}
-            unassigned = []
-            for li in items:
-                if li.job_id:
-                    grouped.setdefault(li.job_id, []).append(li)
-                else:
-                    unassigned.append(li)
-            return grouped, unassigned
+        doc = load_shared_doc(token)
+        ro = doc.repair_order
+        cust = ro.customer
+        veh = ro.vehicle
+        items = doc.line_items
 
         items_by_job, unassigned_items = group_items(items)
-        job_ids = list(items_by_job.keys())
-        jobs = []
-        if job_ids:
-            jobs = Job.query.filter(Job.id.in_(job_ids)).order_by(Job.sort_order.asc(), Job.created_at.asc()).all()
-        job_totals_map = job_totals(doc.id)
+        jobs = [j for j in ro.jobs if j.id in items_by_job]
+        job_totals_map, _ = totals_by_job(items)
+        totals = compute_document_totals(doc, items, ro.jobs)
 
         pdf_url = url_for("share_doc_pdf", token=token)
         return render_template(
@@ -1381,6 +1751,7 @@ def create_app():
             unassigned_items=unassigned_items,
             jobs=jobs,
             job_totals=job_totals_map,
+            totals=totals,
             pdf_url=pdf_url,
         )
 
@@ -1390,21 +1761,23 @@ def create_app():
         if doc.doc_type != "estimate":
             abort(400)
 
-        job = Job.query.get_or_404(job_id)
+        job = db.get_or_404(Job, job_id)
         if job.ro_id != doc.ro_id:
             abort(404)
 
         new_status = (request.form.get("status") or "").strip()
-        if new_status not in ("approved", "declined"):
+        if new_status not in SHARE_JOB_STATUSES:
             abort(400)
 
         old = job.status
         job.status = new_status
         db.session.add(job)
         log_event(doc.ro_id, "job_status", f"{job.title}:{old}", f"{job.title}:{new_status}")
+        if "declined" in (old, new_status):
+            persist_ro_totals(doc.ro_id)
 
         if new_status == "approved":
-            ro = RepairOrder.query.get_or_404(job.ro_id)
+            ro = db.get_or_404(RepairOrder, job.ro_id)
             if ro.status in ("open", "estimate_sent"):
                 ro.status = "work_in_progress"
                 db.session.add(ro)
@@ -1414,16 +1787,12 @@ def create_app():
 
     @app.get("/share/<string:token>/document.pdf")
     def share_doc_pdf(token):
-        doc = Document.query.filter_by(share_token=token).first_or_404()
-        ro = RepairOrder.query.get_or_404(doc.ro_id)
-        cust = Customer.query.get_or_404(ro.customer_id)
-        veh = Vehicle.query.get_or_404(ro.vehicle_id)
-
-        items = LineItem.query.filter_by(document_id=doc.id).order_by(LineItem.created_at.asc()).all()
-        recalc_document_totals(doc)
-        db.session.commit()
-
-        pdf_buf = build_document_pdf(ro, cust, veh, doc, items, title=doc.doc_type.capitalize())
+        doc = load_shared_doc(token)
+        ro = doc.repair_order
+        pdf_buf = cached_pdf(doc, lambda: build_document_pdf(
+            ro, ro.customer, ro.vehicle, doc, doc.line_items, title=doc.doc_type.capitalize(),
+            totals=compute_document_totals(doc, doc.line_items, ro.jobs),
+        ))
         filename = f"{doc.doc_type.capitalize()}_RO_{ro.ro_number}.pdf"
         return send_file(pdf_buf, mimetype="application/pdf", as_attachment=False, download_name=filename)
 
@@ -1431,32 +1800,28 @@ def create_app():
     @app.get("/ros/<string:ro_id>/invoice.pdf")
     @login_required
     def invoice_pdf(ro_id):
-        ro = RepairOrder.query.get_or_404(ro_id)
-        cust = Customer.query.get_or_404(ro.customer_id)
-        veh = Vehicle.query.get_or_404(ro.vehicle_id)
-
+        ro = db.get_or_404(RepairOrder, ro_id)
         invoice = get_or_create_doc(ro.id, "invoice")
-        items = LineItem.query.filter_by(document_id=invoice.id).order_by(LineItem.created_at.asc()).all()
-        recalc_document_totals(invoice)
-        db.session.commit()
-
-        pdf_buf = build_invoice_pdf(ro, cust, veh, invoice, items)
+        invoice = load_doc(Document.id == invoice.id)
+        ro = invoice.repair_order
+        pdf_buf = cached_pdf(invoice, lambda: build_invoice_pdf(
+            ro, ro.customer, ro.vehicle, invoice, invoice.line_items,
+            totals=compute_document_totals(invoice, invoice.line_items, ro.jobs),
+        ))
         return send_file(pdf_buf, mimetype="application/pdf", as_attachment=False,
                          download_name=f"Invoice_RO_{ro.ro_number}.pdf")
 
     @app.get("/ros/<string:ro_id>/estimate.pdf")
     @login_required
     def estimate_pdf(ro_id):
-        ro = RepairOrder.query.get_or_404(ro_id)
-        cust = Customer.query.get_or_404(ro.customer_id)
-        veh = Vehicle.query.get_or_404(ro.vehicle_id)
-
+        ro = db.get_or_404(RepairOrder, ro_id)
         estimate = get_or_create_doc(ro.id, "estimate")
-        items = LineItem.query.filter_by(document_id=estimate.id).order_by(LineItem.created_at.asc()).all()
-        recalc_document_totals(estimate)
-        db.session.commit()
-
-        pdf_buf = build_document_pdf(ro, cust, veh, estimate, items, title="Estimate")
+        estimate = load_doc(Document.id == estimate.id)
+        ro = estimate.repair_order
+        pdf_buf = cached_pdf(estimate, lambda: build_document_pdf(
+            ro, ro.customer, ro.vehicle, estimate, estimate.line_items, title="Estimate",
+            totals=compute_document_totals(estimate, estimate.line_items, ro.jobs),
+        ))
         return send_file(pdf_buf, mimetype="application/pdf", as_attachment=False,
                          download_name=f"Estimate_RO_{ro.ro_number}.pdf")
 
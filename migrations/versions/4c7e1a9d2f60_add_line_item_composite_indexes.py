@@ -0,0 +1,28 @@
+"""add line item composite indexes
+
+Revision ID: 4c7e1a9d2f60
+Revises: b185cdf9e3a8
+Create Date: 2026-10-15 09:12:41.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c7e1a9d2f60'
+down_revision = 'b185cdf9e3a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('line_items', schema=None) as batch_op:
+        batch_op.create_index('ix_lineitem_doc_job_type', ['document_id', 'job_id', 'item_type'], unique=False)
+        batch_op.drop_index('ix_line_items_document_id')
+
+
+def downgrade():
+    with op.batch_alter_table('line_items', schema=None) as batch_op:
+        batch_op.create_index('ix_line_items_document_id', ['document_id'], unique=False)
+        batch_op.drop_index('ix_lineitem_doc_job_type')
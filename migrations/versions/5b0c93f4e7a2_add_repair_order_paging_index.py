@@ -0,0 +1,26 @@
+"""add repair order paging index
+
+Revision ID: 5b0c93f4e7a2
+Revises: e3f81b6c0d57
+Create Date: 2026-10-15 11:20:08.671542
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b0c93f4e7a2'
+down_revision = 'e3f81b6c0d57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('repair_orders', schema=None) as batch_op:
+        batch_op.create_index('ix_ro_deleted_opened_id', ['deleted_at', 'opened_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('repair_orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_ro_deleted_opened_id')
@@ -0,0 +1,33 @@
+"""add number sequences
+
+Revision ID: 71d4c2a8e9f0
+Revises: 5b0c93f4e7a2
+Create Date: 2026-10-15 11:58:33.102764
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '71d4c2a8e9f0'
+down_revision = '5b0c93f4e7a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('number_sequences',
+    sa.Column('name', sa.String(length=40), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # continue numbering from the highest existing RO (first RO is 1001)
+    op.execute("""
+        INSERT INTO number_sequences (name, value)
+        SELECT 'ro_number', COALESCE(MAX(ro_number), 1000) FROM repair_orders
+    """)
+
+
+def downgrade():
+    op.drop_table('number_sequences')
@@ -0,0 +1,35 @@
+"""add document revision and document/job updated_at
+
+Revision ID: 8e4b7d2c1f93
+Revises: c62f0e1d8a45
+Create Date: 2026-10-15 17:05:41.318027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b7d2c1f93'
+down_revision = 'c62f0e1d8a45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing rows start at the migration time; the app sets it from then on
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()))
+        batch_op.add_column(sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()))
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('revision')
+        batch_op.drop_column('updated_at')
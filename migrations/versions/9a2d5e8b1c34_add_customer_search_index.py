@@ -0,0 +1,26 @@
+"""add customer search index
+
+Revision ID: 9a2d5e8b1c34
+Revises: 4c7e1a9d2f60
+Create Date: 2026-10-15 10:02:17.904311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a2d5e8b1c34'
+down_revision = '4c7e1a9d2f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.create_index('ix_customers_deleted_created', ['deleted_at', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.drop_index('ix_customers_deleted_created')
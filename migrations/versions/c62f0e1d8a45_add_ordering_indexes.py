@@ -0,0 +1,42 @@
+"""add ordering indexes
+
+Revision ID: c62f0e1d8a45
+Revises: 71d4c2a8e9f0
+Create Date: 2026-10-15 15:42:19.204867
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c62f0e1d8a45'
+down_revision = '71d4c2a8e9f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_jobs_ro_sort_created', ['ro_id', 'sort_order', 'created_at'], unique=False)
+        batch_op.drop_index('ix_jobs_ro_id')
+
+    with op.batch_alter_table('line_items', schema=None) as batch_op:
+        batch_op.create_index('ix_lineitem_doc_created', ['document_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('ro_events', schema=None) as batch_op:
+        batch_op.create_index('ix_ro_events_ro_created', ['ro_id', 'created_at'], unique=False)
+        batch_op.drop_index('ix_ro_events_ro_id')
+
+
+def downgrade():
+    with op.batch_alter_table('ro_events', schema=None) as batch_op:
+        batch_op.create_index('ix_ro_events_ro_id', ['ro_id'], unique=False)
+        batch_op.drop_index('ix_ro_events_ro_created')
+
+    with op.batch_alter_table('line_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_lineitem_doc_created')
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_jobs_ro_id', ['ro_id'], unique=False)
+        batch_op.drop_index('ix_jobs_ro_sort_created')
@@ -0,0 +1,37 @@
+"""add ro event counters
+
+Revision ID: e3f81b6c0d57
+Revises: 9a2d5e8b1c34
+Create Date: 2026-10-15 10:41:55.230187
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3f81b6c0d57'
+down_revision = '9a2d5e8b1c34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ro_event_counters',
+    sa.Column('event_type', sa.String(length=40), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('event_type')
+    )
+    # backfill from existing events on non-archived ROs
+    op.execute("""
+        INSERT INTO ro_event_counters (event_type, count)
+        SELECT t.event_type, COUNT(e.id)
+        FROM (SELECT 'estimate_sent' AS event_type UNION ALL SELECT 'approved') t
+        LEFT JOIN ro_events e ON e.event_type = t.event_type
+            AND e.ro_id IN (SELECT id FROM repair_orders WHERE deleted_at IS NULL)
+        GROUP BY t.event_type
+    """)
+
+
+def downgrade():
+    op.drop_table('ro_event_counters')
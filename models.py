@@ -29,6 +29,10 @@ class Customer(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     deleted_at = db.Column(db.DateTime, nullable=True)
 
+    __table_args__ = (
+        db.Index("ix_customers_deleted_created", "deleted_at", "created_at"),
+    )
+
 class Vehicle(db.Model):
     __tablename__ = "vehicles"
     id = db.Column(db.String(36), primary_key=True, default=uuid_str)
@@ -66,10 +70,28 @@ class RepairOrder(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     deleted_at = db.Column(db.DateTime, nullable=True)
 
+    customer = db.relationship("Customer")
+    vehicle = db.relationship("Vehicle")
+    documents = db.relationship("Document", back_populates="repair_order")
+    jobs = db.relationship("Job", order_by="(Job.sort_order, Job.created_at)")
+
+    __table_args__ = (
+        db.Index("ix_ro_deleted_opened_id", "deleted_at", "opened_at", "id"),
+    )
+
+class NumberSequence(db.Model):
+    """
+    Named counters for human-facing numbers (MySQL has no SEQUENCE).
+    Bump with a single UPDATE so the row lock serializes concurrent callers.
+    """
+    __tablename__ = "number_sequences"
+    name = db.Column(db.String(40), primary_key=True)
+    value = db.Column(db.Integer, nullable=False)
+
 class ROEvent(db.Model):
     __tablename__ = "ro_events"
     id = db.Column(db.String(36), primary_key=True, default=uuid_str)
-    ro_id = db.Column(db.String(36), db.ForeignKey("repair_orders.id"), nullable=False, index=True)
+    ro_id = db.Column(db.String(36), db.ForeignKey("repair_orders.id"), nullable=False)
 
     event_type = db.Column(db.String(40), nullable=False)
     old_value = db.Column(db.Text, nullable=True)
@@ -77,6 +99,19 @@ class ROEvent(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_ro_events_ro_created", "ro_id", "created_at"),
+    )
+
+class ROEventCounter(db.Model):
+    """
+    Running count of selected ROEvent types across non-archived ROs,
+    kept up to date by log_event() so the dashboard doesn't scan ro_events.
+    """
+    __tablename__ = "ro_event_counters"
+    event_type = db.Column(db.String(40), primary_key=True)
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+
 class Document(db.Model):
     __tablename__ = "documents"
     id = db.Column(db.String(36), primary_key=True, default=uuid_str)
@@ -95,6 +130,12 @@ class Document(db.Model):
     locked_at = db.Column(db.DateTime, nullable=True)
     sent_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # bumped on every line item write; unlike updated_at it can't repeat within a second
+    revision = db.Column(db.Integer, nullable=False, default=0)
+
+    repair_order = db.relationship("RepairOrder", back_populates="documents")
+    line_items = db.relationship("LineItem", order_by="LineItem.created_at")
 
     __table_args__ = (
         db.UniqueConstraint("ro_id", "doc_type", "version", name="uq_doc_ro_type_version"),
@@ -104,7 +145,7 @@ class Document(db.Model):
 class Job(db.Model):
     __tablename__ = "jobs"
     id = db.Column(db.String(36), primary_key=True, default=uuid_str)
-    ro_id = db.Column(db.String(36), db.ForeignKey("repair_orders.id"), nullable=False, index=True)
+    ro_id = db.Column(db.String(36), db.ForeignKey("repair_orders.id"), nullable=False)
     tech_id = db.Column(db.String(36), db.ForeignKey("technicians.id"), nullable=True, index=True)
 
     title = db.Column(db.String(180), nullable=False)
@@ -113,12 +154,17 @@ class Job(db.Model):
     completed_at = db.Column(db.DateTime, nullable=True)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_jobs_ro_sort_created", "ro_id", "sort_order", "created_at"),
+    )
 
 class LineItem(db.Model):
     __tablename__ = "line_items"
     id = db.Column(db.String(36), primary_key=True, default=uuid_str)
 
-    document_id = db.Column(db.String(36), db.ForeignKey("documents.id"), nullable=False, index=True)
+    document_id = db.Column(db.String(36), db.ForeignKey("documents.id"), nullable=False)
     job_id = db.Column(db.String(36), db.ForeignKey("jobs.id"), nullable=True, index=True)
 
     item_type = db.Column(db.String(20), nullable=False)  # labor/part/fee/discount
@@ -133,6 +179,11 @@ class LineItem(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_lineitem_doc_job_type", "document_id", "job_id", "item_type"),
+        db.Index("ix_lineitem_doc_created", "document_id", "created_at"),
+    )
+
 class Appointment(db.Model):
     __tablename__ = "appointments"
     id = db.Column(db.String(36), primary_key=True, default=uuid_str)
@@ -12,12 +12,19 @@ def money(x) -> str:
         x = Decimal("0.00")
     return f"${Decimal(x):,.2f}"
 
-def build_document_pdf(ro, customer, vehicle, document, line_items, title=None):
+def build_document_pdf(ro, customer, vehicle, document, line_items, title=None, output=None, totals=None):
+    """
+    Renders into `output` (any writable binary file object, BytesIO if omitted)
+    and returns it rewound to the start. `totals` (subtotal/tax/total) defaults
+    to the figures stored on `document`.
+    """
     business_name = os.getenv("BUSINESS_NAME", "Roane Diagnostics")
     phone = os.getenv("BUSINESS_PHONE", "")
     doc_title = title or document.doc_type.capitalize()
 
-    buf = BytesIO()
+    totals = totals or document
+
+    buf = output if output is not None else BytesIO()
     c = canvas.Canvas(buf, pagesize=letter)
     width, height = letter
 
@@ -75,14 +82,14 @@ def build_document_pdf(ro, customer, vehicle, document, line_items, title=None):
     y -= 14
     c.setFont("Helvetica-Bold", 10)
     c.drawRightString(500, y, "Subtotal:")
-    c.drawRightString(560, y, money(document.subtotal))
+    c.drawRightString(560, y, money(totals.subtotal))
     y -= 14
     c.drawRightString(500, y, "Tax:")
-    c.drawRightString(560, y, money(document.tax))
+    c.drawRightString(560, y, money(totals.tax))
     y -= 16
     c.setFont("Helvetica-Bold", 12)
     c.drawRightString(500, y, "Total:")
-    c.drawRightString(560, y, money(document.total))
+    c.drawRightString(560, y, money(totals.total))
 
     c.showPage()
     c.save()
@@ -90,5 +97,6 @@ def build_document_pdf(ro, customer, vehicle, document, line_items, title=None):
     return buf
 
 
-def build_invoice_pdf(ro, customer, vehicle, document, line_items):
-    return build_document_pdf(ro, customer, vehicle, document, line_items, title="Invoice")
+def build_invoice_pdf(ro, customer, vehicle, document, line_items, output=None, totals=None):
+    return build_document_pdf(ro, customer, vehicle, document, line_items, title="Invoice", output=output,
+                              totals=totals)